@@ -1,14 +1,91 @@
 # app.py
 
+import math
+import os
+import numba
 import streamlit as st
 import time
+from functools import partial
+
+# Numba-Threading-Schicht der App, sofern nicht über die Umgebung vorgegeben: OpenMP, sonst workqueue (dort
+# serialisiert src.calculation die Starts). TBB zuletzt, denn sobald ein Kernel aus einem Nebenthread lief
+# (Streamlit-Skript, progressiver Lauf), endet der Prozess unter TBB nicht mehr.
+if "NUMBA_THREADING_LAYER_PRIORITY" not in os.environ: numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
 
 # Import the new comparison plot function
+from src import calculation, instrumentation
 from src.calculation import calculate_force_prideaux, calculate_force_direct
+from src.octree import MAX_PAIRS, calculate_force_octree, choose_method
+from src.store import default_store
+from src.progressive import ProgressiveRun, refinement_orders
 from src.visualization import plot_simulation_scene, plot_prideaux_flow, plot_prideaux_method_decomposition, plot_method_comparison
 
 st.set_page_config(layout="wide", page_title="Gravitations-Simulator", page_icon="🧊")
 
+# Das Rechenmodul ist Streamlit-frei; JIT-Warm-up hängt erst die App an. Ergebnisse landen im
+# persistenten Speicher, den alle Worker, Replikate und Batch-Läufe teilen.
+result_store = default_store()
+
+@st.cache_resource(show_spinner="Numba-Kernel werden vorbereitet...")
+def warmup_kernels():
+    with instrumentation.measure() as warm: calculation.warmup()
+    return warm
+
+jit_warmup = warmup_kernels()
+
+def compute_order(n, size1, size2, gap, engine, prideaux):
+    """Ein Verfeinerungsschritt für den progressiven Modus: (Kraft, Prideaux-Zwischenwerte oder None)."""
+    if prideaux:
+        result = calculate_force_prideaux(n, size1, engine, store=result_store)
+        return result[0], result
+    return calculate_force_direct(n, size1, size2, gap, engine, store=result_store), None
+
+def show_progress(run):
+    polling = not run.done
+
+    @st.fragment(run_every=0.5 if polling else None)
+    def panel():
+        run.heartbeat()
+        rows = run.snapshot()
+        if rows:
+            latest = rows[-1]
+            st.metric(label=f"Gravitationskraft F bei N = {latest['order']}", value=f"{latest['force']:.10f}",
+                      delta=None if latest["delta"] is None else f"|ΔF| = {latest['delta']:.1e}", delta_color="off")
+            st.dataframe([{"N": r["order"], "F": f"{r['force']:.12f}", "|ΔF| zur Vorstufe": "–" if r["delta"] is None else f"{r['delta']:.2e}",
+                           "Zeit [s]": f"{r['elapsed']:.2f}"} for r in rows], hide_index=True, use_container_width=True)
+        if run.error is not None:
+            st.error(f"Berechnung fehlgeschlagen: {run.error}")
+        elif not run.done:
+            if len(rows) < len(run.orders): st.caption(f"Rechne Ordnung N = {run.orders[len(rows)]} ({len(rows) + 1}/{len(run.orders)}) ...")
+            if run.cancelled: st.caption("Wird nach der laufenden Ordnung abgebrochen ...")
+            elif st.button("⏹️ Abbrechen"): run.cancel()
+        elif run.cancelled:
+            st.warning(f"Abgebrochen nach {len(rows)} von {len(run.orders)} Ordnungen.")
+        else:
+            st.success(f"Alle {len(run.orders)} Ordnungen in {rows[-1]['elapsed']:.2f} Sekunden berechnet.")
+        if polling and run.done: st.rerun()
+
+    panel()
+
+def show_performance(perf, warm):
+    """Aufschlüsselung der letzten Berechnung nach den Zählern aus src.instrumentation."""
+    counts, seconds = perf["counts"], perf["seconds"]
+    kernel = sum(v for k, v in seconds.items() if k.startswith("kernel."))
+    store_time, classify = seconds.get("store", 0.0), seconds.get("classify", 0.0)
+    cols = st.columns(4)
+    cols[0].metric("Kernel", f"{kernel * 1000:.1f} ms")
+    cols[1].metric("Ergebnisspeicher", f"{store_time * 1000:.1f} ms")
+    cols[2].metric("Klassifikation", f"{classify * 1000:.2f} ms")
+    cols[3].metric("Übrige Zeit", f"{max(0.0, perf['wall'] - kernel - store_time - classify) * 1000:.1f} ms")
+    engines = sorted(k.split(".")[1] for k in counts if k.startswith("kernel.") and k.endswith(".pairs"))
+    if engines:
+        st.dataframe([{"Engine": e, "Kernel-Aufrufe": counts.get(f"kernel.{e}.calls", 0), "Paare": counts[f"kernel.{e}.pairs"],
+                       "Zeit [ms]": f"{seconds.get(f'kernel.{e}', 0.0) * 1000:.1f}"} for e in engines], hide_index=True, use_container_width=True)
+    rate = instrumentation.hit_rate(counts, ("store.solution", "store.pair"))
+    st.caption(f"Ergebnisspeicher: {'keine Zugriffe' if rate is None else f'{rate:.0%} Treffer'} · Multipolauswertungen: {counts.get('multipole.evaluations', 0)} · "
+               f"JIT in dieser Berechnung: {seconds.get('jit.compile', 0.0):.2f} s · Warm-up beim Start: {warm['wall']:.2f} s, "
+               f"davon übersetzt {warm['seconds'].get('jit.compile', 0.0):.2f} s (0 = aus dem Numba-Cache geladen)")
+
 st.title("🧊 Interaktiver Gravitations-Simulator für Würfel")
 
 # --- Main Tabs for App Structure ---
@@ -21,26 +98,68 @@ with tab_sim:
         size1 = st.number_input("Kantenlänge Würfel 1 (L₁)", 0.1, 10.0, 1.0, 0.1)
         size2 = st.number_input("Kantenlänge Würfel 2 (L₂)", 0.1, 10.0, 1.0, 0.1)
         gap = st.number_input("Abstand", 0.0, 10.0, 0.0, 0.1, format="%.2f")
-        gauss_n = st.slider("Gauß-Quadratur Ordnung (N)", 2, 12, 8, help="Für 10-stellige Genauigkeit sind hohe Werte (N > 10) erforderlich.")
-        st.info(f"**Punkte pro Integral:** {gauss_n**6:,}")
-        st.warning("**Achtung:** Werte für N > 8 können **sehr lange** Rechenzeiten haben (mehrere Minuten!).")
+        engine = st.selectbox("Quadratur-Engine", calculation.ENGINES, format_func=lambda e: {"reduced": "Differenz-reduziert (3D)", "tensor": "Tensorprodukt (6D)", "analytic": "Analytisch (geschlossene Form)"}[e],
+                              help="Die reduzierte Engine summiert nur über verschiedene Koordinatendifferenzen und liefert bis auf Rundung dieselben Werte. "
+                                   "Die analytische Engine wertet die geschlossene Form (Eckensumme) für Quader aus; N spielt dort keine Rolle. "
+                                   "Bei großem Abstand löscht sich die Eckensumme aus, dann wird mit Multipolreihe bzw. Quadratur nachgerechnet.")
+        method = choose_method(size1, size2, gap, engine)
+        adaptive = st.toggle("Zielgenauigkeit statt fester Ordnung", help="Die Ordnung wird je Teilwürfelpaar so klein wie möglich gewählt, bis die Fehlerschätzung die Zielgenauigkeit einhält.")
+        if adaptive:
+            progressive = False
+            tol = st.select_slider("Zielgenauigkeit", options=[10.0**-k for k in range(4, 14)], value=1e-10, format_func=lambda t: f"{t:.0e}")
+            gauss_n = None
+        else:
+            tol = None
+            # Hierarchische Zerlegung und Multipolentwicklung hängen nicht vom gewählten N ab, eine Folge fester N gibt es dort nicht
+            fixed_n = method not in ("octree", "multipole")
+            progressive = engine != "analytic" and st.toggle("Progressive Berechnung", disabled=not fixed_n,
+                                                             help="Rechnet im Hintergrund mit N = 2, 4, 6, ... bis zum gewählten N und zeigt jeden Zwischenstand sofort an. "
+                                                                  "Nicht für nahe Würfel verschiedener Größe (hierarchische Zerlegung) und weit getrennte Würfel (Multipolentwicklung).") and fixed_n
+            gauss_n = st.slider("Gauß-Quadratur Ordnung (N)", 2, 40 if engine == "reduced" else 12, 8, help="Für 10-stellige Genauigkeit sind hohe Werte (N > 10) erforderlich.")
+            if method == "multipole": st.info("Die Würfel sind weit getrennt und werden über die Multipolentwicklung gerechnet; N spielt dabei keine Rolle.")
+            else: st.info(f"**Punkte pro Integral:** {gauss_n**6:,}")
+            if engine == "tensor": st.warning("**Achtung:** Werte für N > 8 können **sehr lange** Rechenzeiten haben (mehrere Minuten!).")
+            elif gauss_n > 30: st.warning("**Achtung:** Die Prideaux-Methode braucht für N > 30 bis zu einer Minute.")
+        performance = st.toggle("Performance-Details", help="Zeigt nach der Berechnung, wie sich die Zeit auf Kernel, Ergebnisspeicher und Klassifikation verteilt.")
 
     # --- Logic to select the calculation method ---
-    is_prideaux_case = (gap == 0.0 and size1 == size2)
+    # Berührende oder fast berührende Würfel verschiedener Größe: hierarchische Zerlegung statt direkter Integration;
+    # bei großem Abstand schaltet calculate_force_direct auf die Multipolentwicklung um (Schwelle hängt von tol ab)
+    method = choose_method(size1, size2, gap, engine, tol)
+    is_prideaux_case, is_octree_case = method == "prideaux", method == "octree"
+    target_tol = tol if adaptive else 1e-10
 
     st.header("Simulation und Ergebnis")
 
-    if st.button("▶️ Gravitationskraft berechnen", type="primary"):
-        with st.spinner(f"Berechnung läuft..."):
+    clicked = st.button("▶️ Gravitationskraft berechnen", type="primary")
+    if clicked and progressive:
+        previous_run = st.session_state.get("progressive_run")
+        if previous_run is not None: previous_run.cancel()
+        compute = partial(compute_order, size1=size1, size2=size2, gap=gap, engine=engine, prideaux=is_prideaux_case)
+        st.session_state["progressive_run"] = ProgressiveRun(compute, refinement_orders(gauss_n)).start()
+    if progressive and st.session_state.get("progressive_run") is not None:
+        show_progress(st.session_state["progressive_run"])
+
+    if clicked and not progressive:
+        with st.spinner(f"Berechnung läuft..."), instrumentation.measure() as perf:
             start_time = time.time()
+            error_estimate = None
             if is_prideaux_case:
-                force, s_f, s_e, s_v, v, e = calculate_force_prideaux(gauss_n, size1)
+                result = calculate_force_prideaux(gauss_n, size1, engine, tol=tol, store=result_store)
+                force, s_f, s_e, s_v, v, e = result[:6]
+                if adaptive: error_estimate = result[6]
                 method_used = "Prideaux-Methode"
+            elif is_octree_case:
+                force, error_estimate, octree_stats = calculate_force_octree(size1, size2, gap, target_tol, engine, store=result_store)
+                method_used = "Hierarchische Zerlegung"
             else:
-                force = calculate_force_direct(gauss_n, size1, size2, gap)
-                method_used = "Direkte Integration"
+                result = calculate_force_direct(gauss_n, size1, size2, gap, engine, tol=tol, store=result_store)
+                force, error_estimate = result if adaptive else (result, None)
+                method_used = "Multipolentwicklung" if method == "multipole" else "Direkte Integration"
             duration = time.time() - start_time
         st.success(f"Berechnung in {duration:.2f} Sekunden abgeschlossen!")
+        stats = result_store.stats()
+        st.caption(f"Ergebnisspeicher: {stats['entries']:,} Einträge, {stats['hits']:,} Treffer / {stats['misses']:,} Fehlzugriffe in diesem Prozess")
 
         # --- Results Display in columns ---
         col1, col2 = st.columns([2, 1])
@@ -51,12 +170,27 @@ with tab_sim:
         with col2:
             st.subheader("🎉 Ergebnis")
             st.metric(label="Berechnete Gravitationskraft F", value=f"{force:.10f}")
+            if error_estimate is not None:
+                st.caption(f"Fehlerschätzung: {error_estimate:.1e}" if math.isfinite(error_estimate) else "Fehlerschätzung: keine, die Quadratur konvergiert hier nicht erkennbar")
+                if is_octree_case and octree_stats["budget_exhausted"]:
+                    st.warning(f"Das Budget von {MAX_PAIRS:,} Teilpaaren ist ausgeschöpft; die Fehlerschätzung gibt die erreichte Genauigkeit an.")
+                elif error_estimate > target_tol: st.warning("Die Zielgenauigkeit wurde nicht erreicht." if is_octree_case else "Die Zielgenauigkeit wurde bis N = 40 nicht erreicht.")
             st.subheader("Analyse")
             if is_prideaux_case:
                 st.info(f"**Methode:** {method_used}\n\nEs wurde der Spezialfall für identische, berührende Würfel erkannt und die hochpräzise Prideaux-Methode verwendet.")
+            elif is_octree_case:
+                st.info(f"**Methode:** {method_used}\n\nDie Würfel liegen nah beieinander. Nahe Paare werden über die geschlossene Form ausgewertet "
+                        f"und nur dann in Achtel geteilt, wenn deren Rundungsfehler die Zielgenauigkeit verfehlt ({octree_stats['levels']} Ebenen, {octree_stats['evaluations']:,} ausgewertete und "
+                        f"{octree_stats['reused']:,} wiederverwendete Teilpaare).")
+            elif method == "multipole":
+                st.info(f"**Methode:** {method_used}\n\nDie Würfel sind weit voneinander entfernt. Die Kraft wurde aus einer Taylorentwicklung "
+                        "um die Mittelpunktsdifferenz berechnet, deren a-priori-Schranke die Genauigkeit garantiert; die Ordnung N wurde nicht verwendet.")
             else:
                 st.info(f"**Methode:** {method_used}\n\nDie Kraft wurde durch direkte Integration berechnet.")
-                if gap == 0.0: st.warning("Da sich die Würfel berühren, kann das Ergebnis der direkten Integration ungenau sein.")
+                if gap == 0.0 and engine != "analytic": st.warning("Da sich die Würfel berühren, kann das Ergebnis der direkten Integration ungenau sein.")
+
+        if performance:
+            with st.expander("⏱️ Performance", expanded=True): show_performance(perf, jit_warmup)
 
         st.markdown("---")
 
@@ -74,11 +208,13 @@ with tab_sim:
                 with tab_decomp:
                     st.subheader("Visuelle Zerlegung der Würfel"); fig_decomp = plot_prideaux_method_decomposition(size1); st.pyplot(fig_decomp, use_container_width=True)
         else:
-            st.info("Für die direkte Integration gibt es keine weitere Zerlegungs-Analyse.")
+            st.info(f"Für die Methode „{method_used}“ gibt es keine weitere Zerlegungs-Analyse.")
             
 with tab_vergleich:
     st.header("Vergleich der Berechnungsmethoden")
-    st.markdown("Die App verwendet je nach Konfiguration zwei fundamental unterschiedliche Methoden, um die Gravitationskraft zu berechnen.")
+    st.markdown("Die App wählt je nach Konfiguration eine von vier Methoden, um die Gravitationskraft zu berechnen. Die Grafik zeigt die beiden "
+                "Grundideen, direkte Integration und Prideaux-Zerlegung; die hierarchische Zerlegung verallgemeinert die zweite, die "
+                "Multipolentwicklung ersetzt die erste bei großem Abstand.")
     
     fig_comp = plot_method_comparison()
     st.pyplot(fig_comp, use_container_width=True)
@@ -87,7 +223,7 @@ with tab_vergleich:
     with col1:
         st.subheader("Direkte Integration")
         st.info("""
-        - **Wann:** Immer wenn die Würfel einen **Abstand** haben oder **unterschiedliche Größen** besitzen.
+        - **Wann:** Wenn die Würfel **deutlich getrennt**, aber nicht weit voneinander entfernt sind (sowie mit der analytischen Engine).
         - **Wie:** Die Anziehungskraft zwischen Millionen von winzigen Punktpaaren in den beiden Würfeln wird angenähert und aufsummiert.
         - **Vorteil:** Universell einsetzbar für jede Geometrie ohne Berührung.
         - **Nachteil:** Bei Berührung (Abstand = 0) wird diese Methode ungenau, da der Abstand zwischen Punkten null werden kann (Singularität).
@@ -99,4 +235,21 @@ with tab_vergleich:
         - **Wie:** Ein mathematischer Trick. Die Würfel werden in 8 Teilwürfel zerlegt. Anstatt die problematischen, sich berührenden Paare zu berechnen, werden nur die Kräfte der einfach zu berechnenden, getrennten Paare summiert. Über eine Rekursionsformel wird daraus die exakte Gesamtkraft rekonstruiert.
         - **Vorteil:** Umgeht die Singularität elegant und liefert ein extrem präzises Ergebnis.
         - **Nachteil:** Funktioniert nur für diesen einen Spezialfall.
+        """)
+    col3, col4 = st.columns(2)
+    with col3:
+        st.subheader("Hierarchische Zerlegung")
+        st.info("""
+        - **Wann:** Wenn sich Würfel **unterschiedlicher Größe** berühren oder **sehr nah** beieinander liegen.
+        - **Wie:** Nahe Würfelpaare werden über die geschlossene Form (Eckensumme) ausgewertet, die bei Berührung nicht singulär ist. Reicht deren Rundungsgenauigkeit nicht, werden sie rekursiv in Achtel geteilt; gleichartige Teilpaare werden nur einmal gerechnet.
+        - **Vorteil:** Verallgemeinert die Prideaux-Idee auf beliebige Größen und Abstände, meist in Millisekunden und mit Fehlerschätzung.
+        - **Nachteil:** Genauer als die Rundung der Eckensumme wird es nur über viele Teilpaare; ein Budget begrenzt den Aufwand.
+        """)
+    with col4:
+        st.subheader("Multipolentwicklung")
+        st.info("""
+        - **Wann:** Wenn die Würfel **weit voneinander entfernt** sind.
+        - **Wie:** Die Kraft wird um die Mittelpunktsdifferenz in eine Reihe entwickelt: erst die Kraft zweier Punktmassen, dann Korrekturen höherer Ordnung.
+        - **Vorteil:** Sehr schnell, mit beweisbarer Fehlerschranke; die Ordnung N der Quadratur spielt keine Rolle.
+        - **Nachteil:** Konvergiert nur, wenn der Abstand groß gegenüber den Kantenlängen ist.
         """)
\ No newline at end of file
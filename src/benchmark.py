@@ -0,0 +1,187 @@
+# src/benchmark.py
+#
+# Benchmark-Suite für beide Methoden über mehrere Ordnungen, Kantenlängen und Engines. Je Fall werden
+# erster Aufruf und eingeschwungene Laufzeit, Kernel-Aufrufe und ausgewertete Paare, Trefferquote und Laufzeit
+# einer wiederholten Rechnung gegen den Ergebnisspeicher und die Genauigkeit in Stellen festgehalten; die JIT-Übersetzung wird in frischen Prozessen
+# gemessen (einmal ohne, einmal mit Numba-Cache). Das Ergebnis ist eine JSON-Datei, die sich mit einer
+# früheren vergleichen lässt:
+#
+#   python -m src.benchmark --out benchmark.json
+#   python -m src.benchmark --quick --out new.json --compare benchmark.json
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numba
+import numpy as np
+
+from src import instrumentation
+from src.calculation import ANALYTIC_ROUNDING, box_force_analytic_batch, calculate_force_direct, calculate_force_prideaux, warmup
+from src.octree import calculate_force_octree
+from src.store import ResultStore
+
+# Literaturwert der Kraft zwischen zwei berührenden Einheitswürfeln, auf 10 Stellen angegeben
+LITERATURE_FORCE = 0.9259812606
+LITERATURE_DIGITS = 10.0
+# Mehr Stellen gibt double nicht her; darunter begrenzt die Fehlerschätzung der Referenz die Stellen
+MAX_DIGITS = 15.0
+# Relative Zielgenauigkeit der Quadratur-Referenz, falls sich die Eckensumme der geschlossenen Form auslöscht
+REFERENCE_RTOL = 1e-14
+
+_COMPILE_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from src import calculation, instrumentation
+imported = time.perf_counter()
+calculation.warmup()
+print(json.dumps({"import_seconds": imported - start, "warmup_seconds": time.perf_counter() - imported,
+                  "compile_seconds": instrumentation.snapshot()["seconds"].get("jit.compile", 0.0),
+                  "compilations": instrumentation.snapshot()["counts"].get("jit.compile.calls", 0)}))
+"""
+
+def measure_compile():
+    """JIT-Kosten in zwei frischen Prozessen mit leerem bzw. gerade befülltem NUMBA_CACHE_DIR."""
+    root = Path(__file__).resolve().parent.parent
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir, PYTHONPATH=str(root))
+        runs = [json.loads(subprocess.run([sys.executable, "-c", _COMPILE_SCRIPT], env=env, cwd=root, check=True,
+                                          capture_output=True, text=True).stdout.strip().splitlines()[-1]) for _ in range(2)]
+    return {"cold": runs[0], "cached": runs[1]}
+
+def cases(quick=False):
+    """Die Benchmark-Fälle als dicts (name, method, engine, order, tol, size1, size2, gap)."""
+    orders = (4, 8, 12) if quick else (4, 8, 12, 16, 24, 32)
+    result = []
+    add = lambda method, engine, order=None, tol=None, size1=1.0, size2=1.0, gap=0.0: result.append(
+        {"name": f"{method}/{engine}/{'N=' + str(order) if tol is None else f'tol={tol:.0e}'}/{size1:g}-{size2:g}-{gap:g}",
+         "method": method, "engine": engine, "order": order, "tol": tol, "size1": size1, "size2": size2, "gap": gap})
+    for n in orders: add("prideaux", "reduced", n)
+    for n in orders:
+        if n <= 8: add("prideaux", "tensor", n)
+    add("prideaux", "analytic", 0)
+    for tol in (1e-6, 1e-10): add("prideaux", "reduced", tol=tol)
+    for size1, size2, gap in ((1.0, 1.0, 0.5), (1.0, 0.5, 0.1), (2.0, 1.0, 1.0)):
+        for n in orders[:3]: add("direct", "reduced", n, size1=size1, size2=size2, gap=gap)
+        add("direct", "reduced", tol=1e-10, size1=size1, size2=size2, gap=gap)
+    add("direct", "reduced", 8, gap=20.0)
+    add("octree", "reduced", tol=1e-10, size2=0.5)
+    if not quick: add("octree", "reduced", tol=1e-6, size1=2.0, size2=0.7, gap=0.05)
+    return result
+
+def solve(case, store=None):
+    """Rechnet einen Fall und gibt die Kraft zurück."""
+    n, tol, engine = case["order"], case["tol"], case["engine"]
+    if case["method"] == "prideaux":
+        return calculate_force_prideaux(n, case["size1"], engine, tol=tol, store=store)[0]
+    if case["method"] == "octree":
+        return calculate_force_octree(case["size1"], case["size2"], case["gap"], tol, engine, store=store)[0]
+    result = calculate_force_direct(n, case["size1"], case["size2"], case["gap"], engine, tol=tol, store=store)
+    return result if tol is None else result[0]
+
+def reference(case):
+    """(Referenzwert, Stellen, ab denen die Referenz selbst nicht mehr genauer ist)."""
+    if case["method"] == "prideaux" and case["size1"] == 1.0: return LITERATURE_FORCE, LITERATURE_DIGITS
+    size1, size2, gap = case["size1"], case["size2"], case["gap"]
+    exact, scale = box_force_analytic_batch(size1, np.array([[size1 + gap, 0.0, 0.0]]), size2)
+    value, error = float(exact[0]), ANALYTIC_ROUNDING * float(scale[0])
+    # Bei großem Abstand löscht sich die Eckensumme aus. Dort dient hochgradige Quadratur als Referenz, nicht die
+    # Multipolreihe, die calculate_force_direct bei diesem Abstand selbst verwendet und damit gegen sich mäße.
+    if gap > 0.0 and error > REFERENCE_RTOL * abs(value):
+        quad, quad_error = calculate_force_direct(None, size1, size2, gap, tol=REFERENCE_RTOL * abs(value), far_field=False)
+        if quad_error < error: value, error = quad, quad_error
+    return value, MAX_DIGITS if error == 0.0 else min(MAX_DIGITS, -math.log10(error / abs(value)))
+
+def digits(value, exact, cap):
+    """Korrekte Dezimalstellen von value gegenüber exact, höchstens cap."""
+    if value == exact: return cap
+    return min(cap, -math.log10(abs(value - exact) / abs(exact)))
+
+def run_case(case, store, repeat=3):
+    """Misst einen Fall: erster Aufruf mit Zählern, eingeschwungene Zeit (Minimum aus repeat) und eine
+    wiederholte Rechnung gegen store, nachdem ein erster Lauf ihn gefüllt hat."""
+    with instrumentation.measure() as first: force = solve(case)
+    steady = min(_wall(lambda: solve(case)) for _ in range(repeat))
+    solve(case, store)
+    with instrumentation.measure() as stored: solve(case, store)
+    exact, cap = reference(case)
+    counts = first["counts"]
+    return {**case, "force": force, "reference": exact, "digits": digits(force, exact, cap),
+            "first_seconds": first["wall"], "steady_seconds": steady,
+            "kernel_seconds": sum(v for k, v in first["seconds"].items() if k.startswith("kernel.")),
+            "kernel_calls": sum(v for k, v in counts.items() if k.startswith("kernel.") and k.endswith(".calls")),
+            "kernel_pairs": sum(v for k, v in counts.items() if k.startswith("kernel.") and k.endswith(".pairs")),
+            "multipole_evaluations": counts.get("multipole.evaluations", 0),
+            "compile_seconds": first["seconds"].get("jit.compile", 0.0),
+            "store_hit_rate": instrumentation.hit_rate(stored["counts"], ("store.solution", "store.pair")),
+            "stored_seconds": stored["wall"], "store_seconds": stored["seconds"].get("store", 0.0)}
+
+def _wall(func):
+    start = time.perf_counter(); func()
+    return time.perf_counter() - start
+
+def run_benchmarks(quick=False, repeat=3, compile_runs=True, progress=None):
+    """Führt alle Fälle aus und gibt den Bericht als dict zurück.
+
+    Der Ergebnisspeicher ist eine leere temporäre Datenbank, die alle Fälle der Reihe nach teilen; Trefferquote
+    und Laufzeit stammen aus der Wiederholung eines Falls und zeigen, was ein gefüllter Speicher einspart.
+    """
+    report = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                       "numpy": np.__version__, "numba": numba.__version__, "threads": numba.get_num_threads(),
+                       "machine": platform.machine(), "quick": quick, "repeat": repeat}}
+    if compile_runs: report["compile"] = measure_compile()
+    with instrumentation.measure() as warm: warmup()
+    report["warmup"] = {"seconds": warm["wall"], "compile_seconds": warm["seconds"].get("jit.compile", 0.0)}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(Path(tmp) / "bench.sqlite")
+        all_cases = cases(quick); report["cases"] = []
+        for i, case in enumerate(all_cases):
+            report["cases"].append(run_case(case, store, repeat))
+            if progress: progress(i + 1, len(all_cases), report["cases"][-1])
+    return report
+
+def compare(baseline, current, slowdown=1.5, min_seconds=0.005, digits_drop=0.5):
+    """Regressionen von current gegenüber baseline als Liste lesbarer Meldungen (leer = keine)."""
+    old = {case["name"]: case for case in baseline["cases"]}
+    problems = []
+    for case in current["cases"]:
+        before = old.get(case["name"])
+        if before is None: continue
+        if case["steady_seconds"] > max(min_seconds, slowdown * before["steady_seconds"]):
+            problems.append(f"{case['name']}: {before['steady_seconds']:.4f} s -> {case['steady_seconds']:.4f} s")
+        if case["digits"] < before["digits"] - digits_drop:
+            problems.append(f"{case['name']}: {before['digits']:.1f} -> {case['digits']:.1f} Stellen")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark der Rechenmethoden")
+    parser.add_argument("--out", default="benchmark.json", help="Zieldatei (JSON)")
+    parser.add_argument("--quick", action="store_true", help="Nur niedrige Ordnungen, für schnelle Vergleiche")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen für die eingeschwungene Laufzeit")
+    parser.add_argument("--no-compile", action="store_true", help="JIT-Messung in frischen Prozessen überspringen")
+    parser.add_argument("--compare", help="Früherer Bericht; Regressionen führen zu Exit-Code 1")
+    parser.add_argument("--slowdown", type=float, default=1.5, help="Zulässiger Faktor der Laufzeit gegenüber --compare")
+    args = parser.parse_args(argv)
+
+    report_case = lambda i, total, row: print(f"[{i}/{total}] {row['name']}: {row['steady_seconds']:.4f} s, "
+                                              f"{row['digits']:.1f} Stellen, {row['kernel_pairs']} Paare", flush=True)
+    report = run_benchmarks(args.quick, args.repeat, not args.no_compile, report_case)
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    if "compile" in report:
+        print(f"JIT: {report['compile']['cold']['compile_seconds']:.2f} s übersetzen, "
+              f"{report['compile']['cached']['warmup_seconds']:.2f} s aus dem Cache laden")
+    print(f"Bericht in {args.out}")
+    if args.compare:
+        problems = compare(json.loads(Path(args.compare).read_text()), report, args.slowdown)
+        for problem in problems: print("Regression:", problem)
+        if problems: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# src/instrumentation.py
+#
+# Zähler und Zeitmessung für die heißen Pfade der Rechenmodule: Kernel-Aufrufe und ausgewertete Paare je
+# Engine, Zugriffe auf den Ergebnisspeicher, Klassifikation der Prideaux-Paare, Multipolauswertungen.
+# Gezählt wird einmal je gebündeltem Aufruf, nicht je Quadraturpunkt; der Aufwand bleibt daher vernachlässigbar.
+# Wer Ereignisse selbst verarbeiten will (Tracing, Logging), registriert einen Hook mit add_hook.
+
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import numba.core.event
+
+_lock = threading.Lock()
+_counts = Counter()
+_seconds = defaultdict(float)
+_hooks = []
+
+def add_hook(callback):
+    """Registriert callback(name, wert); aufgerufen bei jedem count (wert = Anzahl) und timed (wert = Sekunden)."""
+    _hooks.append(callback)
+    return callback
+
+def remove_hook(callback):
+    if callback in _hooks: _hooks.remove(callback)
+
+def count(name, n=1):
+    with _lock: _counts[name] += n
+    for hook in _hooks: hook(name, n)
+
+def add_time(name, seconds):
+    with _lock: _seconds[name] += seconds; _counts[name + ".calls"] += 1
+    for hook in _hooks: hook(name, seconds)
+
+@contextmanager
+def timed(name):
+    """Addiert die Laufzeit des Blocks unter name und zählt den Aufruf unter name + '.calls'."""
+    start = time.perf_counter()
+    try: yield
+    finally: add_time(name, time.perf_counter() - start)
+
+class _CompileListener(numba.core.event.Listener):
+    """Misst JIT-Übersetzungen unter "jit.compile"; aus dem Cache geladene Kernel lösen kein Ereignis aus.
+    Verschachtelte Übersetzungen (aufgerufene Funktionen) gehen in der äußeren auf."""
+    def __init__(self):
+        self._local = threading.local()
+
+    def on_start(self, event):
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0: self._local.start = time.perf_counter()
+        self._local.depth = depth + 1
+
+    def on_end(self, event):
+        self._local.depth -= 1
+        if self._local.depth == 0: add_time("jit.compile", time.perf_counter() - self._local.start)
+
+numba.core.event.register("numba:compile", _CompileListener())
+
+def snapshot():
+    """Kopie aller Zähler als {"counts": {...}, "seconds": {...}}."""
+    with _lock: return {"counts": dict(_counts), "seconds": dict(_seconds)}
+
+def reset():
+    with _lock: _counts.clear(); _seconds.clear()
+
+def hit_rate(counts, prefix="store.pair"):
+    """Trefferquote aus den Zählern prefix + '.hits' / '.misses' (prefix auch als Tupel, dann summiert);
+    None, wenn nicht nachgeschlagen wurde."""
+    prefixes = (prefix,) if isinstance(prefix, str) else prefix
+    hits, misses = (sum(counts.get(p + suffix, 0) for p in prefixes) for suffix in (".hits", ".misses"))
+    return hits / (hits + misses) if hits + misses else None
+
+@contextmanager
+def measure():
+    """Liefert ein dict, das beim Verlassen des Blocks die Zuwächse aller Zähler und die Gesamtzeit enthält.
+
+    Die Zähler sind prozessweit; laufen parallel andere Berechnungen (z. B. ein progressiver Lauf), zählen sie mit.
+    """
+    result = {}
+    before = snapshot(); start = time.perf_counter()
+    try: yield result
+    finally:
+        wall = time.perf_counter() - start; after = snapshot()
+        result["counts"] = {k: v - before["counts"].get(k, 0) for k, v in after["counts"].items() if v != before["counts"].get(k, 0)}
+        result["seconds"] = {k: v - before["seconds"].get(k, 0.0) for k, v in after["seconds"].items() if v != before["seconds"].get(k, 0.0)}
+        result["wall"] = wall
@@ -0,0 +1,80 @@
+# src/multipole.py
+#
+# Fernfeld-Backend für weit getrennte, achsenparallele Würfel. Mit s = u - v (u, v Punkte relativ zu den
+# Würfelmittelpunkten) wird der Integrand X/R^3 um die Mittelpunktsdifferenz c in eine Taylorreihe entwickelt.
+# Weil die Würfel achsenparallel sind, faktorisieren die Momente von s je Achse; ungerade Momente verschwinden.
+# Der Monopol ist die Punktmasse, bei Würfeln verschwindet der Quadrupol, die erste Korrektur ist Grad 4.
+#
+# Fehlerschranke a priori: Der Anteil vom Grad l ist für |s| <= rho höchstens (l+1) rho^l / |c|^(l+2)
+# (Legendre-Ungleichung P_l^2 + (1-x^2) P_l'^2 / (l(l+1)) <= 1), summiert über alle geraden l > order.
+
+import math
+from functools import lru_cache
+import numpy as np
+from numba import njit
+from src import instrumentation
+
+MAX_ORDER = 24
+
+@lru_cache(maxsize=None)
+def mass_moments(size, order):
+    """Momente ∫ u^j du über [-size/2, size/2] für j = 0..order; einmal je Kantenlänge berechnet."""
+    h = size / 2.0
+    return tuple(2.0 * h**(j + 1) / (j + 1) if j % 2 == 0 else 0.0 for j in range(order + 1))
+
+@lru_cache(maxsize=None)
+def difference_moments(size1, size2, order):
+    """Momente ∫∫ (u - v)^k du dv je Achse, u im Würfel 2, v im Würfel 1 (beide zentriert)."""
+    mu1, mu2 = mass_moments(size1, order), mass_moments(size2, order)
+    return tuple(sum(math.comb(k, j) * mu2[j] * mu1[k - j] * (-1)**(k - j) for j in range(k + 1)) for k in range(order + 1))
+
+@njit(cache=True)
+def inverse_distance_taylor(c, order):
+    """Taylor-Koeffizienten (1/k!) d^k (1/|r|) an der Stelle c für alle Multiindizes k mit |k| <= order."""
+    phi = np.zeros((order + 1, order + 1, order + 1))
+    r2 = c[0]*c[0] + c[1]*c[1] + c[2]*c[2]
+    phi[0, 0, 0] = 1.0 / math.sqrt(r2)
+    # n r^2 phi_k + (2n-1) sum_i c_i phi_(k-e_i) + (n-1) sum_i phi_(k-2e_i) = 0
+    for n in range(1, order + 1):
+        for i in range(n + 1):
+            for j in range(n + 1 - i):
+                k = n - i - j; acc = 0.0
+                if i > 0: acc += (2*n - 1) * c[0] * phi[i - 1, j, k]
+                if j > 0: acc += (2*n - 1) * c[1] * phi[i, j - 1, k]
+                if k > 0: acc += (2*n - 1) * c[2] * phi[i, j, k - 1]
+                if i > 1: acc += (n - 1) * phi[i - 2, j, k]
+                if j > 1: acc += (n - 1) * phi[i, j - 2, k]
+                if k > 1: acc += (n - 1) * phi[i, j, k - 2]
+                phi[i, j, k] = -acc / (n * r2)
+    return phi
+
+def multipole_force(size1, size2, delta, order):
+    """x-Kraft zwischen zwei Würfeln mit Mittelpunktsdifferenz delta (Würfel 2 minus Würfel 1), Entwicklung bis Grad order."""
+    order -= order % 2
+    instrumentation.count("multipole.evaluations")
+    phi = inverse_distance_taylor(np.asarray(delta, dtype=np.float64), order + 1)
+    m = difference_moments(float(size1), float(size2), order)
+    # (1/(a!b!c!)) d^(a,b,c) (X/R^3) = -(a+1) phi_(a+1,b,c)
+    force = 0.0
+    for a in range(0, order + 1, 2):
+        for b in range(0, order + 1 - a, 2):
+            for c in range(0, order + 1 - a - b, 2):
+                force -= m[a] * m[b] * m[c] * (a + 1) * phi[a + 1, b, c]
+    return float(force)
+
+def truncation_bound(size1, size2, delta, order):
+    """Obere Schranke für den Abbruchfehler von multipole_force; unendlich, wenn die Reihe nicht sicher konvergiert."""
+    rho = math.sqrt(3.0) / 2.0 * (size1 + size2); dist = math.sqrt(sum(v * v for v in delta))
+    if rho >= dist: return math.inf
+    t = rho / dist; l = order - order % 2 + 2; total = 0.0
+    while True:
+        term = (l + 1) * t**l; total += term
+        if term <= 1e-17 * total: break
+        l += 2
+    return size1**3 * size2**3 * total / dist**2
+
+def choose_order(size1, size2, delta, tol, max_order=MAX_ORDER):
+    """Kleinster gerader Grad <= max_order, dessen Schranke tol einhält, sonst None."""
+    for order in range(0, max_order + 1, 2):
+        if truncation_bound(size1, size2, delta, order) <= tol: return order
+    return None
@@ -0,0 +1,130 @@
+# src/octree.py
+#
+# Hierarchische Unterteilung für berührende und fast berührende Würfel beliebiger Größe, die
+# Verallgemeinerung der Prideaux-Zerlegung. Nahe und berührende Paare werden über die geschlossene Form
+# (Eckensumme) ausgewertet, die dort nicht singulär ist, und nur geteilt, wenn deren Rundungsfehler die Toleranz
+# verfehlt; gut getrennte Paare gehen an die Multipolentwicklung oder adaptive Gauß-Quadratur.
+#
+# Jedes Paar wird auf eine normierte Form gebracht (größerer Würfel mit Kantenlänge 1, Symmetrien der
+# x-Kraft wie in canonical_separation). Kongruente Paare teilen sich so einen Eintrag, die Kraft skaliert mit
+# Länge^4. Auf jeder Ebene wird nur über die verschiedenen normierten Paare mit aufsummierten Gewichten
+# iteriert; bei gleich großen Würfeln bleibt deren Zahl je Ebene beschränkt.
+
+import math
+from collections import defaultdict
+
+from src.calculation import adaptive_pair_forces, analytic_pair_forces, canonical_separation, far_field_order
+from src.multipole import choose_order, multipole_force, truncation_bound
+
+# Paare mit Mindestabstand >= SEPARATION * (größere Kantenlänge) gelten als gut getrennt
+SEPARATION = 0.5
+# Höchstzahl verschiedener normierter Paare je Rechnung; bei Kantenverhältnissen, die nicht auf ein Gitter
+# passen, wächst deren Zahl je Ebene etwa um den Faktor 8, ohne Budget also exponentiell in der Tiefe
+MAX_PAIRS = 1000
+
+def choose_method(size1, size2, gap, engine="reduced", tol=None):
+    """Rechenweg für App, progressiven Modus und Parameterstudien: "prideaux" für gleich große, berührende
+    Würfel, "octree" für nahe oder berührende Würfel verschiedener Größe, "multipole", wenn calculate_force_direct
+    bei diesem Abstand (und tol) auf die Multipolentwicklung umschaltet, sonst "direct". Die analytische
+    Engine ist auch im Nahbereich nicht singulär und rechnet dort direkt."""
+    if gap == 0.0 and size1 == size2: return "prideaux"
+    if engine != "analytic" and gap < SEPARATION * max(size1, size2): return "octree"
+    return "multipole" if far_field_order(size1, size2, gap, tol) is not None else "direct"
+
+def normalize_pair(size1, size2, delta):
+    """(Schlüssel, Vorzeichen, Skala) eines Würfelpaars; Kraft = Vorzeichen * Skala^4 * Kraft(Schlüssel)."""
+    scale = max(size1, size2)
+    (dx, dy, dz), sign = canonical_separation(delta)
+    # Vertauschen der Würfel spiegelt delta und Kraft, zusammen mit x→-x bleibt die Kraft gleich
+    key = (round(min(size1, size2) / scale, 12), round(dx / scale, 12), round(dy / scale, 12), round(dz / scale, 12))
+    return key, sign, scale
+
+def gap_of(key):
+    """Mindestabstand der beiden Würfel eines normierten Paars (1 und r an Mittelpunktsdifferenz delta)."""
+    r, dx, dy, dz = key; half = (1.0 + r) / 2.0
+    return math.sqrt(sum(max(0.0, d - half)**2 for d in (dx, dy, dz)))
+
+def split_pair(key):
+    """Kindpaare eines normierten Paars als Liste (Kantenlänge 1, Kantenlänge 2, delta). Geteilt wird der
+    größere Würfel, der kleinere nur, wenn er mehr als 2/3 so groß ist."""
+    r, dx, dy, dz = key
+    octants = [(sx, sy, sz) for sx in (-0.25, 0.25) for sy in (-0.25, 0.25) for sz in (-0.25, 0.25)]
+    small_size, small_centres = (r / 2.0, [(r * cx, r * cy, r * cz) for cx, cy, cz in octants]) if r > 2.0 / 3.0 else (r, [(0.0, 0.0, 0.0)])
+    return [(0.5, small_size, (dx + c2[0] - c1[0], dy + c2[1] - c1[1], dz + c2[2] - c1[2])) for c1 in octants for c2 in small_centres]
+
+def _evaluate(keys, tol, engine, workers, max_n, store):
+    """Normierte Paare gebündelt nach r auswerten: Multipol, wenn die Schranke reicht, sonst adaptive Quadratur."""
+    results = {}
+    by_ratio = defaultdict(list)
+    for key in keys:
+        r, dx, dy, dz = key
+        order = choose_order(1.0, r, (dx, dy, dz), tol)
+        if order is not None: results[key] = (multipole_force(1.0, r, (dx, dy, dz), order), truncation_bound(1.0, r, (dx, dy, dz), order))
+        else: by_ratio[r].append(key)
+    for r, group in by_ratio.items():
+        offsets = [(0.5 + dx - r / 2.0, 0.5 + dy - r / 2.0, 0.5 + dz - r / 2.0) for _, dx, dy, dz in group]
+        forces, errors, _ = adaptive_pair_forces(offsets, 1.0, r, tol, engine, workers, max_n, store)
+        results.update((key, (float(f), float(e))) for key, f, e in zip(group, forces, errors))
+    return results
+
+def _evaluate_closed(keys, workers):
+    """Nahe und berührende Paare über die geschlossene Form; Fehler ist deren Rundungsschätzung (bzw. der Rückfall
+    in analytic_pair_forces, wo sich die Eckensumme auslöscht)."""
+    results = {}
+    by_ratio = defaultdict(list)
+    for key in keys: by_ratio[key[0]].append(key)
+    for r, group in by_ratio.items():
+        offsets = [(0.5 + dx - r / 2.0, 0.5 + dy - r / 2.0, 0.5 + dz - r / 2.0) for _, dx, dy, dz in group]
+        forces, errors = analytic_pair_forces(offsets, 1.0, r, workers)
+        results.update((key, (float(f), float(e))) for key, f, e in zip(group, forces, errors))
+    return results
+
+def calculate_force_octree(size1, size2, gap, tol=1e-10, engine="reduced", max_depth=20, workers=None, max_n=40, store=None,
+                           max_pairs=MAX_PAIRS):
+    """Kraft zwischen zwei achsenparallelen Würfeln durch rekursive Unterteilung nah beieinander liegender Paare.
+
+    Gibt (Kraft, Fehlerschätzung, Statistik) zurück. tol wird je Ebene halbiert und auf die
+    Paare der Ebene nach Gewicht verteilt; nahe Paare werden über die geschlossene Form ausgewertet und nur
+    geteilt, solange deren Fehlerschätzung die Toleranz verfehlt und max_depth nicht erreicht ist. In der Regel
+    genügt so schon die oberste Ebene; engine und max_n gelten für die gut getrennten Paare. Bei
+    Kantenverhältnissen, die nicht auf ein Gitter passen, wächst die Zahl verschiedener Paare je Ebene stark.
+    Insgesamt werden höchstens max_pairs Paare besucht: reicht das Budget nicht für alle Kinder, werden nur die
+    Paare mit dem größten Fehlerbeitrag geteilt, die übrigen gehen mit ihrem Wert ein, die zurückgegebene
+    Schätzung ist dann die tatsächlich erreichte und kann tol überschreiten (Statistik "budget_exhausted").
+    """
+    key, sign, scale = normalize_pair(size1, size2, (size1 / 2.0 + gap + size2 / 2.0, (size2 - size1) / 2.0, (size2 - size1) / 2.0))
+    pending = {key: sign * scale**4}
+    known, closed = {}, {}
+    force = 0.0; error = 0.0
+    stats = {"levels": 0, "pairs": 0, "evaluations": 0, "reused": 0, "budget_exhausted": False}
+    for depth in range(max_depth + 1):
+        if not pending: break
+        stats["levels"] = depth + 1; stats["pairs"] += len(pending)
+        pair_tol = tol / 2.0**(depth + 1) / sum(abs(w) for w in pending.values())
+        last = depth == max_depth
+        separated = {k for k in pending if gap_of(k) >= SEPARATION}
+        todo = [k for k in separated if k not in known or known[k][1] > pair_tol]
+        known.update(_evaluate(todo, pair_tol, engine, workers, max_n, store))
+        # Nahe und berührende Paare: Die Schätzung der geschlossenen Form hängt nicht von tol ab und wird je Klasse
+        # nur einmal gerechnet
+        closed_todo = [k for k in pending if k not in separated and k not in closed]
+        closed.update(_evaluate_closed(closed_todo, workers))
+        evaluated = len(todo) + len(closed_todo)
+        stats["evaluations"] += evaluated; stats["reused"] += len(pending) - evaluated
+        # Teilen, größter Fehlerbeitrag zuerst, solange die Kinder ins Budget passen
+        candidates = [] if last else [k for k in pending if k not in known and closed[k][1] > pair_tol]
+        candidates.sort(key=lambda k: abs(pending[k]) * closed[k][1], reverse=True)
+        split, children = set(), defaultdict(float)
+        for k in candidates:
+            kids = [normalize_pair(s1, s2, delta) for s1, s2, delta in split_pair(k)]
+            if stats["pairs"] + len(children) + len({child for child, child_sign, _ in kids if child_sign and child not in children}) > max_pairs:
+                stats["budget_exhausted"] = True; continue
+            split.add(k)
+            for child, child_sign, child_scale in kids:
+                if child_sign: children[child] += pending[k] * child_sign * child_scale**4
+        for k, w in pending.items():
+            if k in split: continue
+            value = known[k] if k in known else closed[k]
+            force += w * value[0]; error += abs(w) * value[1]
+        pending = {k: w for k, w in children.items() if w != 0.0}
+    return force, error, stats
@@ -0,0 +1,69 @@
+# src/progressive.py
+#
+# Progressive Verfeinerung im Hintergrund: ein Thread rechnet die gewählte Methode mit steigender
+# Ordnung N = 2, 4, 6, ... und legt jeden Zwischenstand ab, sodass die App ihn sofort anzeigen kann.
+# Abbrechen greift zwischen zwei Ordnungen; ein laufender Kernel-Aufruf wird noch zu Ende gerechnet
+# (die Kernel geben dabei den GIL frei, der Server bleibt bedienbar).
+
+import threading
+import time
+
+def refinement_orders(max_n, step=2):
+    """Ordnungen 2, 2+step, ... bis einschließlich max_n."""
+    orders = list(range(2, max_n + 1, step))
+    if orders[-1] != max_n: orders.append(max_n)
+    return orders
+
+class ProgressiveRun:
+    """Rechnet compute(n) für alle Ordnungen in einem Daemon-Thread.
+
+    compute muss (Kraft, Zusatzdaten) liefern. Meldet sich der Aufrufer länger als heartbeat_timeout
+    Sekunden nicht über heartbeat(), gilt der Lauf als verlassen und bricht von selbst ab.
+    """
+    def __init__(self, compute, orders, heartbeat_timeout=10.0):
+        self.orders = list(orders)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.error = None
+        self._compute = compute
+        self._results = []
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._last_heartbeat = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def heartbeat(self):
+        self._last_heartbeat = time.monotonic()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    def snapshot(self):
+        """Kopie der bisherigen Zwischenstände als Liste von dicts (order, force, delta, elapsed, extra)."""
+        with self._lock: return list(self._results)
+
+    def _run(self):
+        start = time.perf_counter(); previous = None
+        try:
+            for n in self.orders:
+                if self._cancel.is_set(): break
+                if time.monotonic() - self._last_heartbeat > self.heartbeat_timeout:
+                    self._cancel.set(); break
+                force, extra = self._compute(n)
+                entry = {"order": n, "force": force, "delta": None if previous is None else abs(force - previous),
+                         "elapsed": time.perf_counter() - start, "extra": extra}
+                with self._lock: self._results.append(entry)
+                previous = force
+        except Exception as exc:
+            self.error = exc
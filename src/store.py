@@ -0,0 +1,85 @@
+# src/store.py
+#
+# Persistenter Ergebnisspeicher für Paarkräfte und komplette Lösungen. Eine SQLite-Datei im WAL-Modus
+# wird von allen Prozessen geteilt (App-Worker, Batch-Läufe, weitere Replikate auf demselben Dateisystem);
+# ist sie voll, werden die am längsten nicht gelesenen Einträge verdrängt (LRU).
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+DEFAULT_PATH = Path.home() / ".cache" / "qubes" / "results.sqlite"
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+def make_key(kind, engine, order, sizes, offset=(), gap=None):
+    """Schlüssel aus (Art, Engine, Ordnung, Kantenlängen, Offset, Abstand); Gleitkommawerte auf 12 Stellen gerundet."""
+    rounded = lambda values: [round(float(v), 12) for v in values]
+    return json.dumps([kind, engine, order, rounded(sizes), rounded(offset), None if gap is None else round(float(gap), 12)])
+
+class ResultStore:
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path); self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = int(max_entries)
+        self.hits = 0; self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, last_access REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+
+    def get_many(self, keys):
+        """Gespeicherte Werte für keys als dict; fehlende Schlüssel fehlen im Ergebnis und zählen als Fehlzugriff."""
+        keys = list(dict.fromkeys(keys)); found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE results SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+            self.hits += len(found); self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def put_many(self, items):
+        """Speichert (Schlüssel, Wert)-Paare; Werte müssen JSON-serialisierbar sein (Zahlen, Listen)."""
+        rows = [(key, json.dumps(value), time.time()) for key, value in items]
+        if not rows: return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO results (key, value, last_access) VALUES (?, ?, ?)", rows)
+                excess = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    self._conn.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_access LIMIT ?)", (excess,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self.hits = 0; self.misses = 0
+
+    def stats(self):
+        with self._lock: entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {"entries": entries, "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+@lru_cache(maxsize=None)
+def default_store():
+    """Prozessweiter Speicher; Pfad und Größe über QUBES_STORE_PATH und QUBES_STORE_MAX_ENTRIES einstellbar."""
+    return ResultStore(os.environ.get("QUBES_STORE_PATH", DEFAULT_PATH), int(os.environ.get("QUBES_STORE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)))
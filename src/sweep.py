@@ -0,0 +1,184 @@
+# src/sweep.py
+#
+# Headless Parameterstudien: Kraft über Kantenlängen, Abstand und Quadraturordnung tabellieren.
+# Konfigurationen mit gleichen Knoten und Gewichten werden gebündelt in einem Kernel-Aufruf gerechnet,
+# die Bündel auf Prozesse verteilt und die Ergebnisse laufend geschrieben (CSV oder Parquet-Verzeichnis).
+# Ein abgebrochener Lauf setzt beim erneuten Start fort und überspringt bereits geschriebene Zeilen.
+#
+#   python -m src.sweep --size1 1 --size2 0.5 1 2 --gap 0 0.1 0.5 --order 8 16 --out sweep.parquet --workers 8
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from src.calculation import ENGINES, calculate_force_prideaux, far_field_force, pair_forces
+from src.octree import calculate_force_octree, choose_method
+from src.store import default_store
+
+COLUMNS = ("method", "engine", "size1", "size2", "gap", "gauss_n", "force", "seconds")
+
+def grid(sizes1, sizes2, gaps, orders):
+    """Alle Kombinationen als Liste von (size1, size2, gap, N)."""
+    return [(float(a), float(b), float(g), int(n)) for a, b, g, n in itertools.product(sizes1, sizes2, gaps, orders)]
+
+# Zielgenauigkeit der hierarchischen Zerlegung, wie in der App bei fester Ordnung
+OCTREE_TOL = 1e-10
+
+def row_key(engine, size1, size2, gap, gauss_n):
+    return (engine, round(float(size1), 12), round(float(size2), 12), round(float(gap), 12), int(gauss_n))
+
+def plan_batches(configs, batch_size=256, engine="reduced"):
+    """Bündelt Konfigurationen mit gleichen Knoten und Gewichten: direkt nach (N, L1, L2), Prideaux nach N.
+    Hierarchisch zerlegte Paare (choose_method) hängen nicht von N ab und werden nach (L1, L2) gebündelt."""
+    groups = defaultdict(list)
+    for size1, size2, gap, n in configs:
+        method = choose_method(size1, size2, gap, engine)
+        # Multipolzeilen bleiben im direkten Bündel, evaluate_batch trennt sie dort ab
+        key = ("prideaux", n) if method == "prideaux" else ("octree", size1, size2) if method == "octree" else ("direct", n, size1, size2)
+        groups[key].append((size1, size2, gap, n))
+    return [(key, members[start:start + batch_size]) for key, members in groups.items() for start in range(0, len(members), batch_size)]
+
+def evaluate_batch(key, configs, engine="reduced", threads=None, use_store=False):
+    """Rechnet ein Bündel aus plan_batches und gibt die Ergebniszeilen als dicts zurück."""
+    store = default_store() if use_store else None
+    start = time.perf_counter()
+    if key[0] == "prideaux":
+        # Ein Lauf für den Einheitswürfel genügt, die Kraft skaliert mit L^4
+        unit = calculate_force_prideaux(key[1], 1.0, engine, threads, store=store)[0]
+        forces = [unit * size1**4 for size1, _, _, _ in configs]
+    elif key[0] == "octree":
+        # Je Abstand eine Zerlegung, gleichgültig für wie viele Ordnungen N
+        _, size1, size2 = key
+        by_gap = {gap: calculate_force_octree(size1, size2, gap, OCTREE_TOL, engine, workers=threads, store=store)[0]
+                  for gap in dict.fromkeys(gap for _, _, gap, _ in configs)}
+        forces = [by_gap[gap] for _, _, gap, _ in configs]
+    else:
+        # Weit getrennte Paare über die Multipolentwicklung, nur der Rest geht gebündelt in den Kernel
+        _, n, size1, size2 = key
+        far = [far_field_force(size1, size2, gap) for _, _, gap, _ in configs]
+        near = [i for i, value in enumerate(far) if value is None]
+        near_forces = pair_forces([(size1 + configs[i][2], 0.0, 0.0) for i in near], size1, size2, n, engine, threads, store)
+        forces = [value[0] if value is not None else None for value in far]
+        for i, force in zip(near, near_forces): forces[i] = force
+    # Zeilen aus der Multipolentwicklung hängen nicht von gauss_n ab und werden als "multipole" ausgewiesen
+    methods = [key[0] if key[0] != "direct" or far[i] is None else "multipole" for i in range(len(configs))]
+    seconds = (time.perf_counter() - start) / len(configs)
+    return [dict(zip(COLUMNS, (method, engine, size1, size2, gap, n, float(force), seconds)))
+            for (size1, size2, gap, n), method, force in zip(configs, methods, forces)]
+
+class _CsvSink:
+    def __init__(self, path): self.path = Path(path)
+
+    def done_keys(self):
+        if not self.path.exists(): return set()
+        self._drop_partial_row()
+        with open(self.path, newline="") as handle:
+            # Zeilen mit fehlenden Feldern (abgebrochener Lauf) zählen nicht als erledigt und werden neu gerechnet
+            return {row_key(r["engine"], r["size1"], r["size2"], r["gap"], r["gauss_n"]) for r in csv.DictReader(handle)
+                    if all(r.get(column) not in (None, "") for column in COLUMNS)}
+
+    def _drop_partial_row(self):
+        """Schneidet eine letzte Zeile ohne Zeilenende ab, wie sie ein beim Schreiben abgebrochener Lauf hinterlässt."""
+        with open(self.path, "rb+") as handle:
+            end = handle.seek(0, os.SEEK_END); pos = end
+            while pos > 0:
+                start = max(0, pos - 65536); handle.seek(start)
+                chunk = handle.read(pos - start)
+                if pos == end and chunk.endswith(b"\n"): return
+                newline = chunk.rfind(b"\n")
+                if newline >= 0: handle.truncate(start + newline + 1); return
+                pos = start
+            handle.truncate(0)
+
+    def write(self, rows):
+        if self.path.exists(): self._drop_partial_row()
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        with open(self.path, "a", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=COLUMNS)
+            if new_file: writer.writeheader()
+            writer.writerows(rows)
+
+class _ParquetSink:
+    """Parquet-Datensatz als Verzeichnis: jedes Bündel wird atomar als eigene Part-Datei geschrieben."""
+    def __init__(self, path):
+        self.path = Path(path); self.path.mkdir(parents=True, exist_ok=True)
+
+    def done_keys(self):
+        import pyarrow.parquet as pq
+        parts = sorted(self.path.glob("part-*.parquet"))
+        if not parts: return set()
+        table = pq.read_table(parts, columns=["engine", "size1", "size2", "gap", "gauss_n"]).to_pydict()
+        return {row_key(*values) for values in zip(*table.values())}
+
+    def write(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        name = f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = self.path / f".{name}.tmp"
+        pq.write_table(pa.Table.from_pylist(rows), tmp)
+        os.replace(tmp, self.path / name)
+
+def open_sink(out_path):
+    return _CsvSink(out_path) if str(out_path).endswith(".csv") else _ParquetSink(out_path)
+
+def run_sweep(configs, out_path, engine="reduced", workers=1, use_store=False, batch_size=256, progress=None):
+    """Rechnet alle noch nicht in out_path vorhandenen Konfigurationen und gibt die Zahl neu geschriebener Zeilen zurück.
+
+    workers > 1 verteilt die Bündel auf Prozesse (je Prozess ein Numba-Thread); progress(geschrieben, gesamt)
+    wird nach jedem Bündel aufgerufen.
+    """
+    if engine not in ENGINES: raise ValueError(f"Unbekannte Engine '{engine}', erlaubt: {', '.join(ENGINES)}")
+    sink = open_sink(out_path)
+    done = sink.done_keys()
+    todo = list(dict.fromkeys(c for c in configs if row_key(engine, *c) not in done))
+    batches = plan_batches(todo, batch_size, engine)
+    written = 0
+    if workers <= 1:
+        for key, members in batches:
+            rows = evaluate_batch(key, members, engine, None, use_store)
+            sink.write(rows); written += len(rows)
+            if progress: progress(written, len(todo))
+        return written
+    # Frische Prozesse statt fork: Numbas TBB- und OpenMP-Schicht überstehen kein fork, sobald im Elternprozess
+    # ein Kernel lief (Hänger beim Beenden bzw. BrokenProcessPool)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(evaluate_batch, key, members, engine, 1, use_store) for key, members in batches]
+        for future in as_completed(futures):
+            rows = future.result()
+            sink.write(rows); written += len(rows)
+            if progress: progress(written, len(todo))
+    return written
+
+def read_configs(path):
+    """Konfigurationsliste aus einer CSV-Datei mit den Spalten size1, size2, gap, gauss_n."""
+    with open(path, newline="") as handle:
+        return [(float(r["size1"]), float(r["size2"]), float(r["gap"]), int(r["gauss_n"])) for r in csv.DictReader(handle)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parameterstudie der Gravitationskraft zwischen zwei Würfeln")
+    parser.add_argument("--size1", type=float, nargs="+", default=[1.0], help="Kantenlängen Würfel 1")
+    parser.add_argument("--size2", type=float, nargs="+", default=[1.0], help="Kantenlängen Würfel 2")
+    parser.add_argument("--gap", type=float, nargs="+", default=[0.0], help="Abstände")
+    parser.add_argument("--order", type=int, nargs="+", default=[8], help="Gauß-Quadratur Ordnungen N")
+    parser.add_argument("--configs", help="CSV mit Spalten size1,size2,gap,gauss_n statt des Gitters")
+    parser.add_argument("--engine", choices=ENGINES, default="reduced")
+    parser.add_argument("--out", required=True, help="Zieldatei .csv oder Parquet-Verzeichnis")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Anzahl Prozesse")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--store", action="store_true", help="Persistenten Ergebnisspeicher verwenden")
+    args = parser.parse_args(argv)
+
+    configs = read_configs(args.configs) if args.configs else grid(args.size1, args.size2, args.gap, args.order)
+    report = lambda written, total: print(f"{written}/{total} Konfigurationen geschrieben", flush=True)
+    written = run_sweep(configs, args.out, args.engine, args.workers, args.store, args.batch_size, report)
+    print(f"Fertig: {written} neue Zeilen in {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# tests/test_benchmark.py
+
+from src.benchmark import compare, digits
+
+def report(*cases):
+    return {"cases": [{"name": name, "steady_seconds": seconds, "digits": accuracy} for name, seconds, accuracy in cases]}
+
+def test_compare_without_changes_is_clean():
+    baseline = report(("a", 0.1, 10.0), ("b", 0.001, 14.0))
+    assert compare(baseline, baseline) == []
+
+def test_compare_flags_slowdown_and_lost_digits():
+    baseline = report(("slow", 0.1, 10.0), ("inexact", 0.1, 10.0), ("ok", 0.1, 10.0))
+    current = report(("slow", 0.2, 10.0), ("inexact", 0.1, 9.0), ("ok", 0.14, 9.6))
+    problems = compare(baseline, current)
+    assert len(problems) == 2 and problems[0].startswith("slow:") and problems[1].startswith("inexact:")
+
+def test_compare_ignores_noise_below_min_seconds_and_new_cases():
+    baseline = report(("tiny", 0.0001, 10.0))
+    current = report(("tiny", 0.004, 10.0), ("new", 100.0, 1.0))
+    assert compare(baseline, current) == []
+    assert len(compare(baseline, current, min_seconds=0.001)) == 1
+
+def test_digits():
+    assert digits(1.0, 1.0, 15.0) == 15.0
+    assert abs(digits(1.0 + 1e-6, 1.0, 15.0) - 6.0) < 1e-6
+    assert digits(1.0 + 1e-17, 1.0 - 1e-17, 10.0) == 10.0
@@ -0,0 +1,67 @@
+# tests/test_calculation.py
+
+import itertools
+
+import numba
+import numpy as np
+import pytest
+
+from src.calculation import (PRIDEAUX_BASES, analytic_pair_forces, calculate_force_direct, calculate_force_prideaux, classify_offset,
+                             pair_forces, prideaux_orbits, prideaux_pair_table)
+
+# Literaturwert der Kraft zwischen zwei berührenden Einheitswürfeln
+LITERATURE_FORCE = 0.9259812606
+
+def test_prideaux_touching_unit_cubes_matches_literature():
+    assert calculate_force_prideaux(10, 1.0)[0] == pytest.approx(LITERATURE_FORCE, abs=1e-9)
+
+@pytest.mark.parametrize("name", list(PRIDEAUX_BASES))
+def test_prideaux_orbits_match_brute_force_sum(name):
+    # Alle 64 Teilwürfelkombinationen einzeln gegen die Repräsentanten mit Vorzeichen·Multiplizität
+    basis, d = PRIDEAUX_BASES[name], 0.5
+    offsets = [(basis[0] + j1 - i1, basis[1] + j2 - i2, basis[2] + j3 - i3) for i1, i2, i3, j1, j2, j3 in itertools.product((0, 1), repeat=6)]
+    separated = [tuple(d * v for v in off) for off in offsets if classify_offset(*off) == 'S']
+    brute = pair_forces(separated, d, d, 4).sum()
+    orbits = prideaux_orbits()[name]
+    reps = list(orbits)
+    reduced = np.dot([orbits[rep] for rep in reps], pair_forces([tuple(d * v for v in rep) for rep in reps], d, d, 4))
+    assert reduced == pytest.approx(brute, rel=1e-12)
+    assert sum(mult for table_name, _, _, mult in prideaux_pair_table() if table_name == name) == 64
+
+@pytest.mark.parametrize("size2", [1.0, 0.7])
+def test_reduced_engine_matches_tensor(size2):
+    offsets = [(1.5, 0.0, 0.0), (2.0, 0.5, -0.25), (1.2, 1.0, 1.0), (-1.0 - size2, 0.3, 0.0)]
+    tensor = pair_forces(offsets, 1.0, size2, 6, "tensor")
+    reduced = pair_forces(offsets, 1.0, size2, 6, "reduced")
+    np.testing.assert_allclose(reduced, tensor, rtol=1e-12, atol=1e-15)
+
+@pytest.mark.parametrize("engine", ["reduced", "tensor", "analytic"])
+def test_workers_limit_threads_and_restore_previous_count(engine, monkeypatch):
+    offsets = [(1.5, 0.0, 0.0), (2.0, 0.5, -0.25), (1.2, 1.0, 1.0)]
+    previous = min(2, numba.config.NUMBA_NUM_THREADS)
+    numba.set_num_threads(previous)
+    calls, set_num_threads = [], numba.set_num_threads
+    monkeypatch.setattr(numba, "set_num_threads", lambda n: (calls.append(n), set_num_threads(n)))
+    try:
+        single = pair_forces(offsets, 1.0, 0.7, 4, engine, workers=1)
+        assert calls == [1, previous] and numba.get_num_threads() == previous
+        np.testing.assert_array_equal(single, pair_forces(offsets, 1.0, 0.7, 4, engine))
+    finally: set_num_threads(numba.config.NUMBA_NUM_THREADS)
+
+def test_reduced_prideaux_matches_tensor():
+    tensor, reduced = calculate_force_prideaux(6, 1.0, "tensor"), calculate_force_prideaux(6, 1.0, "reduced")
+    np.testing.assert_allclose(reduced, tensor, rtol=1e-12)
+
+@pytest.mark.parametrize("size1, size2, gap", [(1.0, 1.0, 0.5), (2.0, 1.0, 1.0), (10.0, 0.1, 5.0), (1.0, 1.0, 20.0)])
+def test_analytic_matches_quadrature_within_error_estimate(size1, size2, gap):
+    offset = [(size1 + gap, 0.0, 0.0)]
+    force, error = analytic_pair_forces(offset, size1, size2)
+    converged = pair_forces(offset, size1, size2, 40, "reduced")
+    assert abs(force[0] - converged[0]) <= error[0] + 1e-14 * abs(converged[0])
+
+@pytest.mark.parametrize("tol", [1e-6, 1e-10])
+@pytest.mark.parametrize("size1, size2, gap", [(1.0, 0.5, 0.1), (2.0, 1.0, 1.0), (1.0, 0.2, 0.02)])
+def test_adaptive_error_estimate_covers_actual_error(size1, size2, gap, tol):
+    force, error = calculate_force_direct(None, size1, size2, gap, tol=tol, far_field=False)
+    exact = calculate_force_direct(0, size1, size2, gap, "analytic", far_field=False)
+    assert abs(force - exact) <= error
@@ -0,0 +1,34 @@
+# tests/test_instrumentation.py
+
+import pytest
+
+from src import instrumentation
+
+def test_measure_reports_only_increments():
+    instrumentation.count("test.before", 5)
+    with instrumentation.measure() as result:
+        instrumentation.count("test.events", 3)
+        instrumentation.add_time("test.timer", 0.25)
+    instrumentation.count("test.events")
+    assert result["counts"] == {"test.events": 3, "test.timer.calls": 1}
+    assert result["seconds"] == {"test.timer": pytest.approx(0.25)}
+    assert result["wall"] >= 0.0
+
+def test_hooks_see_counts_and_times():
+    seen = []
+    hook = instrumentation.add_hook(lambda name, value: seen.append((name, value)))
+    try:
+        instrumentation.count("test.hooked", 2)
+        with instrumentation.timed("test.hooked_timer"): pass
+    finally: instrumentation.remove_hook(hook)
+    instrumentation.count("test.hooked")
+    assert [name for name, _ in seen] == ["test.hooked", "test.hooked_timer"] and seen[0][1] == 2
+
+def test_hit_rate():
+    counts = {"store.pair.hits": 3, "store.pair.misses": 1, "store.solution.hits": 1, "store.solution.misses": 3}
+    assert instrumentation.hit_rate(counts) == pytest.approx(0.75)
+    assert instrumentation.hit_rate(counts, ("store.solution", "store.pair")) == pytest.approx(0.5)
+    # Eine ganz aus dem Lösungsspeicher bediente Rechnung schlägt keine Paare nach
+    assert instrumentation.hit_rate({"store.solution.hits": 1}) is None
+    assert instrumentation.hit_rate({"store.solution.hits": 1}, ("store.solution", "store.pair")) == 1.0
+    assert instrumentation.hit_rate({}) is None
@@ -0,0 +1,30 @@
+# tests/test_multipole.py
+
+import numpy as np
+import pytest
+
+from src.calculation import ANALYTIC_ROUNDING, box_force_analytic_batch, calculate_force_direct, far_field_force, far_field_tol
+from src.multipole import multipole_force, truncation_bound
+from src.octree import choose_method
+
+@pytest.mark.parametrize("order", [0, 2, 4, 8])
+@pytest.mark.parametrize("size1, size2, gap", [(1.0, 1.0, 3.0), (2.0, 1.0, 4.0), (1.0, 0.3, 2.0)])
+def test_multipole_matches_analytic_within_truncation_bound(size1, size2, gap, order):
+    delta = (size1 / 2.0 + gap + size2 / 2.0, (size2 - size1) / 2.0, (size2 - size1) / 2.0)
+    exact, scale = box_force_analytic_batch(size1, np.array([[size1 + gap, 0.0, 0.0]]), size2)
+    bound = truncation_bound(size1, size2, delta, order)
+    assert abs(multipole_force(size1, size2, delta, order) - exact[0]) <= bound + ANALYTIC_ROUNDING * scale[0]
+
+@pytest.mark.parametrize("size1, size2, gap", [(10.0, 10.0, 50.0), (0.01, 0.01, 0.05)])
+def test_far_field_switch_is_relative(size1, size2, gap):
+    # Die Umschaltung hängt nur vom Verhältnis der Längen ab; die Kraft skaliert dann exakt mit L^4
+    force, bound = far_field_force(size1, size2, gap, far_field_tol(size1, size2, gap))
+    assert bound <= far_field_tol(size1, size2, gap)
+    assert calculate_force_direct(8, size1, size2, gap) == force
+    assert force == pytest.approx(calculate_force_direct(8, 1.0, 1.0, 5.0) * size1**4, rel=1e-12)
+
+def test_choose_method_reports_far_field_switch():
+    assert choose_method(1.0, 1.0, 5.0) == "multipole"
+    assert calculate_force_direct(8, 1.0, 1.0, 5.0) == far_field_force(1.0, 1.0, 5.0)[0]
+    # Mit strengerer Zielgenauigkeit rückt die Umschaltung weiter hinaus
+    assert choose_method(1.0, 1.0, 1.0) == "direct" and choose_method(1.0, 1.0, 5.0, tol=1e-30) == "direct"
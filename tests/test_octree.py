@@ -0,0 +1,34 @@
+# tests/test_octree.py
+
+import pytest
+
+from src.calculation import calculate_force_direct
+from src.octree import calculate_force_octree
+
+LITERATURE_FORCE = 0.9259812606
+
+def test_touching_unit_cubes_match_literature():
+    force, error, stats = calculate_force_octree(1.0, 1.0, 0.0, 1e-10)
+    assert force == pytest.approx(LITERATURE_FORCE, abs=1e-9)
+    assert error <= 1e-10 and not stats["budget_exhausted"]
+
+@pytest.mark.parametrize("size2, gap", [(0.5, 0.1), (0.7, 0.2)])
+def test_near_pair_matches_converged_quadrature(size2, gap):
+    force, error, stats = calculate_force_octree(1.0, size2, gap, 1e-10)
+    quadrature, quadrature_error = calculate_force_direct(None, 1.0, size2, gap, tol=1e-11, far_field=False)
+    assert abs(force - quadrature) <= error + quadrature_error
+    assert error <= 1e-10 and not stats["budget_exhausted"]
+
+@pytest.mark.parametrize("size2", [0.3, 0.7, 0.13])
+def test_touching_off_grid_ratio_resolves_without_splitting(size2):
+    # Die geschlossene Form ist bei Berührung nicht singulär; geteilt wird erst unterhalb ihrer Rundung
+    force, error, stats = calculate_force_octree(1.0, size2, 0.0, 1e-10)
+    assert error <= 1e-12 * force and stats["pairs"] == 1
+
+def test_budget_stops_refinement_and_reports_reached_error():
+    # Toleranz unter der Rundung der Eckensumme: jede Ebene teilt, bis das Budget erschöpft ist
+    force, error, stats = calculate_force_octree(1.0, 0.3, 0.0, 1e-30, max_n=8, max_pairs=200)
+    assert stats["budget_exhausted"] and stats["pairs"] <= 200
+    assert 1e-30 < error < 1e-6 * force
+    reference = calculate_force_octree(1.0, 0.3, 0.0, 1e-10)
+    assert abs(force - reference[0]) <= error + reference[1]
@@ -0,0 +1,55 @@
+# tests/test_progressive.py
+
+import threading
+import time
+
+import pytest
+
+from src.progressive import ProgressiveRun, refinement_orders
+
+def wait(run):
+    run._thread.join(timeout=5)
+    assert run.done
+
+@pytest.mark.parametrize("max_n, step, expected", [(8, 2, [2, 4, 6, 8]), (7, 2, [2, 4, 6, 7]), (2, 2, [2]), (10, 4, [2, 6, 10])])
+def test_refinement_orders(max_n, step, expected):
+    assert refinement_orders(max_n, step) == expected
+
+def test_all_orders_with_deltas():
+    run = ProgressiveRun(lambda n: (1.0 / n, n), [2, 4, 8]).start(); wait(run)
+    rows = run.snapshot()
+    assert [r["order"] for r in rows] == [2, 4, 8] and [r["extra"] for r in rows] == [2, 4, 8]
+    assert rows[0]["delta"] is None and rows[1]["delta"] == pytest.approx(0.25) and rows[2]["delta"] == pytest.approx(0.125)
+    assert run.error is None and not run.cancelled
+
+def test_cancel_takes_effect_between_orders():
+    started, release = threading.Event(), threading.Event()
+    def compute(n):
+        started.set(); release.wait(5)
+        return float(n), None
+    run = ProgressiveRun(compute, [2, 4, 6]).start()
+    assert started.wait(5)
+    run.cancel(); release.set(); wait(run)
+    # Die laufende Ordnung wird noch fertig gerechnet, danach keine weitere
+    assert [r["order"] for r in run.snapshot()] == [2] and run.cancelled
+
+def test_abandoned_run_cancels_itself():
+    run = ProgressiveRun(lambda n: (float(n), None), [2, 4, 6], heartbeat_timeout=-1.0).start(); wait(run)
+    assert run.snapshot() == [] and run.cancelled
+
+@pytest.mark.parametrize("beating", [True, False])
+def test_heartbeat_keeps_run_alive(beating):
+    # Jede Ordnung dauert länger als heartbeat_timeout; nur mit Heartbeat geht es weiter
+    def compute(n):
+        time.sleep(0.1)
+        if beating: run.heartbeat()
+        return float(n), None
+    run = ProgressiveRun(compute, [2, 4, 6], heartbeat_timeout=0.05).start(); wait(run)
+    assert len(run.snapshot()) == (3 if beating else 1) and run.cancelled != beating
+
+def test_error_is_captured_and_earlier_orders_kept():
+    def compute(n):
+        if n == 4: raise RuntimeError("Kernel fehlgeschlagen")
+        return float(n), None
+    run = ProgressiveRun(compute, [2, 4, 6]).start(); wait(run)
+    assert isinstance(run.error, RuntimeError) and [r["order"] for r in run.snapshot()] == [2]
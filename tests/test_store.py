@@ -0,0 +1,47 @@
+# tests/test_store.py
+
+import itertools
+
+import numpy as np
+import pytest
+
+from src import store as store_module
+from src.calculation import pair_forces
+from src.store import ResultStore, make_key
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Streng steigende Zeitstempel, damit die LRU-Reihenfolge nicht von der Uhrauflösung abhängt."""
+    ticks = itertools.count(1.0)
+    monkeypatch.setattr(store_module.time, "time", lambda: next(ticks))
+
+def test_hits_and_misses_are_counted(tmp_path):
+    store = ResultStore(tmp_path / "results.sqlite")
+    store.put_many([("a", 1.0), ("b", [2.0, 3.0])])
+    assert store.get_many(["a", "b", "c"]) == {"a": 1.0, "b": [2.0, 3.0]}
+    assert store.get("c") is None
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+    assert stats["hit_rate"] == pytest.approx(0.5)
+
+def test_least_recently_read_entries_are_evicted(tmp_path, clock):
+    store = ResultStore(tmp_path / "results.sqlite", max_entries=3)
+    store.put_many([("a", 1.0), ("b", 2.0), ("c", 3.0)])
+    store.get("a")
+    store.put("d", 4.0)
+    assert store.stats()["entries"] == 3
+    assert store.get_many(["a", "b", "c", "d"]) == {"a": 1.0, "c": 3.0, "d": 4.0}
+
+def test_entries_survive_reopening(tmp_path):
+    ResultStore(tmp_path / "results.sqlite").put("a", 1.0)
+    assert ResultStore(tmp_path / "results.sqlite").get("a") == 1.0
+
+def test_pair_forces_reuses_stored_pairs(tmp_path):
+    store = ResultStore(tmp_path / "results.sqlite")
+    offsets = [(1.5, 0.0, 0.0), (2.0, 0.5, 0.0)]
+    first = pair_forces(offsets, 1.0, 1.0, 6, "reduced", store=store)
+    store.put(make_key("pair", "reduced", 6, (1.0, 1.0), offsets[0]), 123.0)
+    second = pair_forces(offsets, 1.0, 1.0, 6, "reduced", store=store)
+    assert second[0] == 123.0 and second[1] == first[1]
+    assert store.stats()["hits"] == 2
+    np.testing.assert_allclose(first, pair_forces(offsets, 1.0, 1.0, 6, "reduced"))
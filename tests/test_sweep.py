@@ -0,0 +1,51 @@
+# tests/test_sweep.py
+
+import csv
+
+from src.calculation import calculate_force_prideaux
+from src.sweep import grid, run_sweep
+
+CONFIGS = grid([1.0], [0.5, 1.0], [0.0, 0.5], [2, 4])
+
+def read_rows(path):
+    with open(path, newline="") as handle: return list(csv.DictReader(handle))
+
+def test_resume_skips_rows_already_written(tmp_path):
+    out = tmp_path / "sweep.csv"
+    assert run_sweep(CONFIGS[:3], out) == 3
+    assert run_sweep(CONFIGS, out) == len(CONFIGS) - 3
+    assert run_sweep(CONFIGS, out) == 0
+    assert len(read_rows(out)) == len(CONFIGS)
+
+def test_resume_after_interrupted_write(tmp_path):
+    out = tmp_path / "sweep.csv"
+    run_sweep(CONFIGS[:2], out)
+    with open(out, "a") as handle: handle.write("prideaux,reduced,1.0,1.0")
+    assert run_sweep(CONFIGS, out) == len(CONFIGS) - 2
+    rows = read_rows(out)
+    assert len(rows) == len(CONFIGS) and all(None not in row.values() for row in rows)
+
+def test_incomplete_rows_are_recomputed(tmp_path):
+    out = tmp_path / "sweep.csv"
+    run_sweep(CONFIGS[:2], out)
+    with open(out, "a") as handle: handle.write("direct,reduced,1.0,0.5,0.5,2\n")
+    assert run_sweep(CONFIGS[:4], out) == 2
+
+def test_parquet_resume(tmp_path):
+    out = tmp_path / "sweep.parquet"
+    assert run_sweep(CONFIGS[:3], out) == 3
+    assert run_sweep(CONFIGS, out) == len(CONFIGS) - 3
+
+def test_method_column_matches_app_dispatch(tmp_path):
+    out = tmp_path / "sweep.csv"
+    run_sweep(grid([1.0], [0.5, 1.0], [0.0, 0.2, 30.0], [4]), out)
+    methods = {(float(r["size2"]), float(r["gap"])): r["method"] for r in read_rows(out)}
+    assert methods == {(1.0, 0.0): "prideaux", (1.0, 0.2): "octree", (1.0, 30.0): "multipole",
+                       (0.5, 0.0): "octree", (0.5, 0.2): "octree", (0.5, 30.0): "multipole"}
+
+def test_process_pool_after_kernel_in_parent(tmp_path):
+    # Ein Kernel im Elternprozess darf die Worker-Prozesse nicht beschädigen
+    calculate_force_prideaux(6, 1.0)
+    out = tmp_path / "sweep.csv"
+    assert run_sweep(CONFIGS, out, workers=2) == len(CONFIGS)
+    assert len(read_rows(out)) == len(CONFIGS)